@@ -1,15 +1,18 @@
 import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from time import time
 
 import gin
+import torch
 
 from ml.handle_data import (
     distribute_data,
     distribute_data_from_save,
     format_out_glob,
     format_out_loc,
-    select_criteria,
+    group_by_criteria,
     shape_data,
 )
 from ml.licchavi import Licchavi
@@ -22,6 +25,14 @@ os.makedirs(FOLDER_PATH, exist_ok=True)
 logging.basicConfig(filename="ml/ml_logs.log", level=logging.INFO)
 
 
+def _init_worker(nb_threads):
+    """ Shares CPU cores between processes training criterias in parallel
+
+    nb_threads (int): number of torch threads for this process
+    """
+    torch.set_num_threads(nb_threads)
+
+
 def _get_licchavi(
         nb_vids, vid_vidx, criteria,
         device, verb, ground_truths, licchavi_class):
@@ -54,7 +65,7 @@ def _get_licchavi(
 
 
 def _set_licchavi(
-    comparison_data,
+    one_crit_data,
     criteria,
     fullpath=None,
     resume=False,
@@ -65,7 +76,8 @@ def _set_licchavi(
 ):
     """Shapes data and inputs it in Licchavi to initialize
 
-    comparison_data (list of lists): output of fetch_data()
+    one_crit_data (list of lists): not None comparisons of -criteria only,
+        as selected by select_criteria() or group_by_criteria()
     criteria (str): rating criteria
     fullpath (str): path from which to load previous training
     resume (bool): wether to resume previous training or not
@@ -81,7 +93,6 @@ def _set_licchavi(
         (int array): array of users IDs in order
     """
     # shape data
-    one_crit_data = select_criteria(comparison_data, criteria)
     if len(one_crit_data) == 0:  # if no data for selected criteria
         logging.warning(f"No comparison for this criteria ({criteria})")
         return None, None
@@ -142,6 +153,52 @@ def _train_predict(
     return glob, loc, uncertainties
 
 
+def _run_criteria(
+    one_crit_data,
+    criteria,
+    epochs,
+    resume,
+    save,
+    verb,
+    device,
+    ground_truths,
+    compute_uncertainty,
+    licchavi_class,
+):
+    """Trains and outputs scores for one criteria, can run in its own process
+
+    one_crit_data (list of lists): comparisons of this criteria only
+    (other arguments: see ml_run())
+
+    Returns:
+        (list list): global scores, formatted as in ml_run()
+        (list list): local scores, formatted as in ml_run()
+        (tuple): (licch, glob, loc, uncertainties) in dev mode, None otherwise
+    """
+    logging.info("PROCESSING " + criteria)
+    fullpath = PATH + "_" + criteria
+
+    # preparing data
+    licch, users_ids = _set_licchavi(
+        one_crit_data, criteria,
+        fullpath, resume, verb, device,
+        ground_truths, licchavi_class=licchavi_class
+    )
+    if licch is None:  # if 0 data for selected criteria
+        return [], [], None
+
+    # training and predicting
+    glob, loc, uncertainties = _train_predict(
+        licch, epochs, fullpath, save, verb,
+        compute_uncertainty=compute_uncertainty
+    )
+    # putting in required shape for output
+    out_glob = format_out_glob(glob, criteria, uncertainties[0])
+    out_loc = format_out_loc(loc, users_ids, criteria, uncertainties[1])
+    dev_info = (licch, glob, loc, uncertainties) if TOURNESOL_DEV else None
+    return out_glob, out_loc, dev_info
+
+
 @gin.configurable
 def ml_run(
     comparison_data,
@@ -154,6 +211,7 @@ def ml_run(
     ground_truths=None,
     compute_uncertainty=False,
     licchavi_class=Licchavi,
+    nb_workers=1,
 ):
     """Runs the ml algorithm for all criterias
 
@@ -168,6 +226,8 @@ def ml_run(
         global, local and s parmaeters ground truths (test mode only)
     licchavi_class (Licchavi()): training structure used
                                         (Licchavi or LicchaviDev)
+    nb_workers (int): number of processes training criterias in parallel
+                        (not used in dev mode or without fork support)
 
     Returns:
         (list list): list of [video_id: int, criteria_name: str,
@@ -178,34 +238,40 @@ def ml_run(
     """  # FIXME: not better to regroup contributors in same list or smthg ?
     ml_run_time = time()
     glob_scores, loc_scores = [], []
-
-    for criteria in criterias:
-        logging.info("PROCESSING " + criteria)
-        fullpath = PATH + "_" + criteria
-
-        # preparing data
-        licch, users_ids = _set_licchavi(
-            comparison_data, criteria,
-            fullpath, resume, verb, device,
-            ground_truths, licchavi_class=licchavi_class
+    dev_info = (None, None, None, None)
+    comparisons_by_crit = group_by_criteria(comparison_data)  # single pass
+    args_list = [
+        (
+            comparisons_by_crit.get(criteria, []), criteria,
+            epochs, resume, save, verb, device,
+            ground_truths, compute_uncertainty, licchavi_class
         )
+        for criteria in criterias
+    ]
 
-        if licch is not None:  # if not 0 data for selected criteria
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    if nb_workers > 1 and not TOURNESOL_DEV and can_fork:
+        # criterias are independent from one another
+        with ProcessPoolExecutor(
+            nb_workers,
+            mp_context=multiprocessing.get_context("fork"),  # no re-import
+            initializer=_init_worker,
+            initargs=(max(1, (os.cpu_count() or 1) // nb_workers),),
+        ) as executor:
+            futures = [executor.submit(_run_criteria, *args) for args in args_list]
+            results = [future.result() for future in futures]
+    else:
+        results = (_run_criteria(*args) for args in args_list)
 
-            # training and predicting
-            glob, loc, uncertainties = _train_predict(
-                licch, epochs, fullpath, save, verb,
-                compute_uncertainty=compute_uncertainty
-            )
-            # putting in required shape for output
-            out_glob = format_out_glob(glob, criteria, uncertainties[0])
-            out_loc = format_out_loc(loc, users_ids, criteria, uncertainties[1])
-            glob_scores += out_glob
-            loc_scores += out_loc
+    for out_glob, out_loc, crit_dev_info in results:
+        glob_scores += out_glob
+        loc_scores += out_loc
+        if crit_dev_info is not None:
+            dev_info = crit_dev_info
 
     logging.info(f'ml_run() total time : {round(time() - ml_run_time)}')
     if TOURNESOL_DEV:  # return more information in dev mode
-        return glob_scores, loc_scores, (licch, glob, loc, uncertainties)
+        return glob_scores, loc_scores, dev_info
     return glob_scores, loc_scores
 
 
@@ -29,21 +29,26 @@ def get_all_vids(arr):
     return np.unique(arr[:, 1:3])  # columns 1 and 2 are what we want
 
 
-def get_mask(batch1, batch2):
+def get_mask(vidxs1, vidxs2, nb_vids, device="cpu"):
     """returns boolean tensor indicating which videos the user rated
 
-    batch1 (2D bool tensor): 1 line is a one-hot encoded video index
-    batch2 (2D bool tensor): 1 line is a one-hot encoded video index
+    vidxs1 (int tensor): indexes of first videos compared by user
+    vidxs2 (int tensor): indexes of second videos compared by user
+    nb_vids (int): total number of videos
+    device (str): device used (cpu/gpu)
 
     Returns:
         (bool tensor): True for all indexes rated by the user
     """
-    return torch.sum(batch1 + batch2, axis=0, dtype=bool)
+    mask = torch.zeros(nb_vids, dtype=bool, device=device)
+    mask[vidxs1] = True
+    mask[vidxs2] = True
+    return mask
 
 
 def sort_by_first(arr):
-    """sorts 2D array lines by first element of lines"""
-    order = np.argsort(arr, axis=0)[:, 0]
+    """sorts 2D array lines by first element of lines (stable)"""
+    order = np.argsort(arr[:, 0], kind="stable")  # only first column sorted
     return arr[order, :]
 
 
@@ -61,20 +66,18 @@ def one_hot_vid(vid_vidx, vid):
     return tens
 
 
-def one_hot_vids(vid_vidx, l_vid, device="cpu"):
-    """One-hot inputs for neural network, list to batch
+def vids_to_vidxs(vid_vidx, l_vid):
+    """Factorizes video IDs into video indexes
 
     vid_vidx (int dictionnary): dictionnary of {vID: vidx}
-    vid (int list): list of vID
-    device (str): device used (cpu/gpu)
+    l_vid (int iterable): list of vID, with repetitions
 
     Returns:
-        (2D boolean tensor): one line is one-hot encoded video index
+        (int array): video indexes, in the same order as -l_vid
     """
-    batch = torch.zeros(len(l_vid), len(vid_vidx), dtype=bool, device=device)
-    for idx, vid in enumerate(l_vid):
-        batch[idx][vid_vidx[vid]] = True
-    return batch
+    vids, inverse = np.unique(l_vid, return_inverse=True)
+    lut = np.array([vid_vidx[vid] for vid in vids], dtype=np.int64)
+    return lut[inverse.ravel()]
 
 
 def get_batch_r(node_arr, device="cpu"):
@@ -84,9 +87,9 @@ def get_batch_r(node_arr, device="cpu"):
     device (str): device used (cpu/gpu)
 
     Returns:
-        (float tensor): batch of ratings
+        (float tensor): batch of ratings (float32, same as models)
     """
-    return torch.FloatTensor(node_arr[:, 3], device=device)
+    return torch.as_tensor(node_arr[:, 3], dtype=torch.float32, device=device)
 
 
 def reverse_idxs(vids):
@@ -38,10 +38,8 @@ S = torch.tensor([0.9])
 nb_vids = 10
 nb_comps = 20
 MODEL = torch.ones(nb_vids, requires_grad=True)
-one_hot = [False] * 10
-one_hot[2] = True
-A_BATCH = torch.tensor([one_hot for _ in range(nb_comps)])
-B_BATCH = torch.tensor([one_hot for _ in range(nb_comps)])
+A_VIDXS = torch.full((nb_comps,), 2)
+B_VIDXS = torch.full((nb_comps,), 2)
 R_BATCH = torch.ones(nb_comps)
 
 
@@ -73,7 +71,7 @@ def bm_get_s_loss():
 
 
 def bm_fit_loss_batch():
-    _ = get_fit_loss(MODEL, S, A_BATCH, B_BATCH, R_BATCH)
+    _ = get_fit_loss(MODEL, S, A_VIDXS, B_VIDXS, R_BATCH)
 
 
 # =========== running tests ==================
@@ -119,8 +119,10 @@ def uncert_stats(licch, loc_uncerts):
     """ Prints and plots about uncertainty """
     l_nb_comps, l_uncerts = [], []
     vid_vidx = licch.vid_vidx
+    nb_vids = len(vid_vidx)
     for uncerts, node in zip(loc_uncerts, licch.nodes.values()):
-        nb_comps = torch.sum(node.vid1, axis=0) + torch.sum(node.vid2, axis=0)
+        nb_comps = torch.bincount(node.vidx1, minlength=nb_vids)
+        nb_comps += torch.bincount(node.vidx2, minlength=nb_vids)
         for uncert, vid in zip(uncerts, node.vids):
             l_nb_comps.append(nb_comps[vid_vidx[int(vid)]].item())
             l_uncerts.append(uncert)
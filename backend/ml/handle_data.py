@@ -10,10 +10,10 @@ from .data_utility import (
     get_all_vids,
     get_batch_r,
     get_mask,
-    one_hot_vids,
     rescale_rating,
     reverse_idxs,
     sort_by_first,
+    vids_to_vidxs,
 )
 
 """
@@ -40,6 +40,22 @@ def select_criteria(comparison_data, crit):
     return l_ratings
 
 
+def group_by_criteria(comparison_data):
+    """Extracts not None comparisons of all criterias in one pass
+
+    comparison_data: output of fetch_data()
+
+    Returns:
+    - dictionnary of {criteria: list of all ratings for this criteria}
+        (same format as select_criteria() output)
+    """
+    dic_ratings = {}
+    for comp in comparison_data:
+        if comp[4] is not None:
+            dic_ratings.setdefault(comp[3], []).append(comp)
+    return dic_ratings
+
+
 def shape_data(l_ratings):
     """Shapes data for distribute_data()/distribute_data_from_save()
 
@@ -65,19 +81,25 @@ def _distribute_data_handler(arr, user_ids, vid_vidx, first_of_each, device="cpu
         (dict): {user ID : tuple of user's data}
     """
     nodes_dic = {}
+    nb_vids = len(vid_vidx)
+    # video IDs factorized once for all users, one line per comparison
+    all_vidxs = vids_to_vidxs(vid_vidx, arr[:, 1:3].ravel()).reshape(-1, 2)
 
     for i, id in enumerate(user_ids):
         node_arr = arr[first_of_each[i]: first_of_each[i + 1], :]
+        node_vidxs = all_vidxs[first_of_each[i]: first_of_each[i + 1], :]
 
-        batch1 = one_hot_vids(vid_vidx, node_arr[:, 1], device)
-        batch2 = one_hot_vids(vid_vidx, node_arr[:, 2], device)
+        vidxs1 = torch.as_tensor(node_vidxs[:, 0], device=device)
+        vidxs2 = torch.as_tensor(node_vidxs[:, 1], device=device)
 
+        node_vids = get_all_vids(node_arr)
         nodes_dic[id] = (
-            batch1,
-            batch2,
+            vidxs1,
+            vidxs2,
             get_batch_r(node_arr, device),
-            get_all_vids(node_arr),
-            get_mask(batch1, batch2),
+            node_vids,
+            torch.as_tensor(vids_to_vidxs(vid_vidx, node_vids), device=device),
+            get_mask(vidxs1, vidxs2, nb_vids, device),
         )
 
     return nodes_dic
@@ -94,8 +116,8 @@ def distribute_data(arr, device="cpu"):
 
 
     Returns:
-    - dictionnary {userID: (vID1_batch, vID2_batch,
-                            rating_batch, single_vIDs, mask)}
+    - dictionnary {userID: (vidx1_batch, vidx2_batch,
+                            rating_batch, single_vIDs, single_vidxs, mask)}
     - array of user IDs
     - dictionnary of {vID: video idx}
     """
@@ -123,8 +145,8 @@ def distribute_data_from_save(arr, fullpath, device):
     device (str): device to use (cpu/gpu)
 
     Returns:
-    - dictionnary {userID: (vID1_batch, vID2_batch,
-                            rating_batch, single_vIDs, masks)}
+    - dictionnary {userID: (vidx1_batch, vidx2_batch,
+                            rating_batch, single_vIDs, single_vidxs, masks)}
     - array of user IDs
     - dictionnary of {vID: video idx}
     """
@@ -157,14 +179,15 @@ def format_out_glob(glob, crit, uncerts):
     - list of [video_id: int, criteria_name: str,
                 score: float, uncertainty: float]
     """
+    scores = glob[1].tolist()  # one conversion instead of one per score
     return [
         [
             int(vid),
             crit,
-            round_loss(score, 2),
+            round(score, 2),
             0 if uncerts is None else round_loss(uncerts[vidx], 2),
         ]
-        for vid, score, vidx in zip(*glob, range(len(glob[0])))
+        for vidx, (vid, score) in enumerate(zip(glob[0], scores))
     ]
 
 
@@ -182,15 +205,17 @@ def format_out_loc(loc, users_ids, crit, uncerts):
     """
     l_out = []
     vids, scores = loc
-    for user_id, user_vids, user_scores, uidx in zip(
-        users_ids, vids, scores, range(len(loc[0]))
+    for uidx, (user_id, user_vids, user_scores) in enumerate(
+        zip(users_ids, vids, scores)
     ):
-        for i in range(len(user_vids)):
+        user_id = int(user_id)
+        # one conversion per user instead of one per score
+        for i, (vid, score) in enumerate(zip(user_vids.tolist(), user_scores.tolist())):
             out = [
-                int(user_id),
-                int(user_vids[i].item()),
+                user_id,
+                int(vid),
                 crit,
-                round_loss(user_scores[i], 2),
+                round(score, 2),
                 0 if uncerts is None else round_loss(uncerts[uidx][i], 2),
             ]
             l_out.append(out)
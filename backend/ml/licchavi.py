@@ -6,9 +6,9 @@ from time import time
 import gin
 import torch
 
-from .data_utility import expand_tens, one_hot_vids
+from .data_utility import expand_tens
 from .dev.visualisation import disp_one_by_line
-from .losses import loss_fit_s_gen, loss_gen_reg, model_norm, predict, round_loss
+from .losses import loss_fit_s_gen, loss_gen_reg, model_norm, round_loss
 from .metrics import (
     check_equilibrium_glob,
     check_equilibrium_loc,
@@ -152,8 +152,8 @@ class Licchavi:
     def set_allnodes(self, data_dic, users_ids):
         """Puts data in Licchavi and create a model for each node
 
-        data_dic (dictionnary): {userID: (vID1_batch, vID2_batch,
-                                            rating_batch, single_vIDs, masks)}
+        data_dic (dictionnary): {userID: (vidx1_batch, vidx2_batch,
+                                rating_batch, single_vIDs, single_vidxs, masks)}
         users_ids (int array): users IDs
         """
         nb = len(data_dic)
@@ -170,8 +170,8 @@ class Licchavi:
     def load_and_update(self, data_dic, user_ids, fullpath):
         """Loads models and expands them as required
 
-        data_dic (dictionnary):  {userID: (vID1_batch, vID2_batch,
-                                    rating_batch, single_vIDs, masks)}
+        data_dic (dictionnary):  {userID: (vidx1_batch, vidx2_batch,
+                                rating_batch, single_vIDs, single_vidxs, masks)}
         user_ids (int array): users IDs
         """
         loginf("Loading models")
@@ -211,8 +211,7 @@ class Licchavi:
         with torch.no_grad():
             glob_scores = self.global_model
             for node in self.nodes.values():
-                input = one_hot_vids(self.vid_vidx, node.vids, self.device)
-                output = predict(input, node.model)
+                output = node.model[node.vidxs]
                 loc_scores.append(output)
                 list_vids_batchs.append(node.vids)
             vids_batch = list(self.vid_vidx.keys())
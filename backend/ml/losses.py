@@ -7,24 +7,6 @@ Main file is "ml_train.py"
 """
 
 
-def predict(input, tens, mask=None):
-    """Predicts score according to a model
-
-    Args:
-        input (bool 2D tensor): one line is a one-hot encoded video index
-        tens (float tensor): tensor = model
-        mask (bool tensor): one element is bool for using this comparison
-
-    Returns:
-        (2D float tensor): score of the videos according to the model
-    """
-    if input.shape[1] == 0:  # if empty input
-        return torch.zeros((1, 1))
-    if mask is not None:
-        return torch.where(mask, torch.matmul(input.float(), tens), torch.zeros(1))
-    return torch.matmul(input.float(), tens)
-
-
 # losses (used in licchavi.py)
 def _bbt_loss(t, r):
     """Binomial Bradley-Terry loss function (used for test only)
@@ -55,30 +37,36 @@ def _approx_bbt_loss(t, r):
         (float tensor): sum of empirical losses for all comparisons of one user
     """
 
-    small = abs(t) <= 0.01
-    medium = torch.logical_and((abs(t) < 10), (abs(t) > 0.01))
-    big = abs(t) >= 10
+    abs_t = abs(t)  # computed once for the 3 masks
+    small = abs_t <= 0.01
+    medium = torch.logical_and((abs_t < 10), (abs_t > 0.01))
+    big = abs_t >= 10
     zer = torch.zeros(1)
-    loss = 0
 
-    loss += torch.where(
-        small, t ** 2 / 6 + r * t + torch.log(torch.tensor(2)), zer
-    ).sum()
     tt = torch.where(t != 0, t, torch.ones(1))  # trick to avoid zeros so NaNs
-    loss += torch.where(medium, torch.log(2 * torch.sinh(tt) / tt) + r * tt, zer).sum()
-    loss += torch.where(big, abs(tt) - torch.log(abs(tt)) + r * tt, zer).sum()
-
-    return loss
-
-
-def get_fit_loss(model, s, a_batch, b_batch, r_batch, vidx=-1):
+    abs_tt = abs(tt)
+    r_tt = r * tt
+    # one piecewise tensor, so one reduction instead of one per case
+    losses = torch.where(
+        small,
+        t ** 2 / 6 + r * t + torch.log(torch.tensor(2)),
+        torch.where(
+            medium,
+            torch.log(2 * torch.sinh(tt) / tt) + r_tt,
+            torch.where(big, abs_tt - torch.log(abs_tt) + r_tt, zer),
+        ),
+    )
+    return losses.sum()
+
+
+def get_fit_loss(model, s, a_vidxs, b_vidxs, r_batch, vidx=-1):
     """Fitting loss for one node
 
     Args:
         model (float tensor): node local model.
         s (float tensor): s parameter.
-        a_batch (bool 2D tensor): first videos compared by user.
-        b_batch (bool 2D tensor): second videos compared by user.
+        a_vidxs (int tensor): indexes of first videos compared by user.
+        b_vidxs (int tensor): indexes of second videos compared by user.
         r_batch (float tensor): rating provided by user.
 
     Returns:
@@ -86,26 +74,17 @@ def get_fit_loss(model, s, a_batch, b_batch, r_batch, vidx=-1):
     """
     if vidx != -1:  # loss for only one video (for uncertainty computation)
 
-        idxs = torch.tensor(
-            [
-                idx
-                for idx, ab in enumerate(zip(a_batch, b_batch))
-                if (ab[0][vidx] or ab[1][vidx])
-            ],
-            dtype=torch.long,
-        )
+        # comparisons involving the video, filtered before any prediction
+        idxs = torch.nonzero((a_vidxs == vidx) | (b_vidxs == vidx)).flatten()
 
         if idxs.shape[0] == 0:  # if user didnt rate video
             return torch.scalar_tensor(0)
 
-        ya_batch = predict(a_batch[idxs], model)
-        yb_batch = predict(b_batch[idxs], model)
-        loss = _approx_bbt_loss(s * (ya_batch - yb_batch), r_batch[idxs])
-    else:
-        ya_batch = predict(a_batch, model)
-        yb_batch = predict(b_batch, model)
-        loss = _approx_bbt_loss(s * (ya_batch - yb_batch), r_batch)
-    return loss
+        a_vidxs, b_vidxs, r_batch = a_vidxs[idxs], b_vidxs[idxs], r_batch[idxs]
+    # gathering scores of compared videos
+    ya_batch = model[a_vidxs]
+    yb_batch = model[b_vidxs]
+    return _approx_bbt_loss(s * (ya_batch - yb_batch), r_batch)
 
 
 def get_s_loss(s):
@@ -183,8 +162,8 @@ def loss_fit_s_gen(licch, vidx=-1, uid=-1):
         fit_loss += get_fit_loss(
             node.model,  # local model
             node.s,  # s
-            node.vid1,  # id_batch1
-            node.vid2,  # id_batch2
+            node.vidx1,  # video indexes 1
+            node.vidx2,  # video indexes 2
             node.r,  # r_batch
             vidx,
         )
@@ -202,8 +181,8 @@ def loss_fit_s_gen(licch, vidx=-1, uid=-1):
             fit_loss += get_fit_loss(
                 node.model,  # local model
                 node.s,  # s
-                node.vid1,  # id_batch1
-                node.vid2,  # id_batch2
+                node.vidx1,  # video indexes 1
+                node.vidx2,  # video indexes 2
                 node.r,  # r_batch
                 vidx,
             )
@@ -1,6 +1,7 @@
 import logging
 
 from django.core.management.base import BaseCommand
+from django.db.models import Func, OuterRef, Subquery
 
 from core.models import User
 from ml.core import TOURNESOL_DEV, ml_run
@@ -51,9 +52,17 @@ USAGE:
 """
 
 
-def fetch_data(poll, trusted_only=True):
+def get_trusted_user_ids():
+    """Returns the IDs of trusted users, meant to be fetched once per run"""
+    return set(User.trusted_users().values_list("id", flat=True))
+
+
+def fetch_data(poll, trusted_only=True, trusted_user_ids=None):
     """Fetches the data from the Comparisons model
 
+    trusted_user_ids (int set): output of get_trusted_user_ids(),
+        fetched here if not provided
+
     Returns:
     - comparison_data: list of
         [   contributor_id: int, video_id_1: int, video_id_2: int,
@@ -61,32 +70,42 @@ def fetch_data(poll, trusted_only=True):
     """
     comparisons_queryset = ComparisonCriteriaScore.objects.filter(
         comparison__poll=poll
-    ).prefetch_related("comparison")
+    )
     if trusted_only:
+        if trusted_user_ids is None:
+            trusted_user_ids = get_trusted_user_ids()
         comparisons_queryset = comparisons_queryset.filter(
-            comparison__user__in=User.trusted_users()
+            comparison__user__in=trusted_user_ids
         )
 
+    # plain tuples in a fixed column order, no model instance per row,
+    # streamed by chunks instead of being cached all at once by the queryset
     comparison_data = [
-        [
-            ccs.comparison.user_id,
-            ccs.comparison.entity_1_id,
-            ccs.comparison.entity_2_id,
-            ccs.criteria,
-            ccs.score,
-            ccs.weight,
-        ]
-        for ccs in comparisons_queryset
+        list(values)
+        for values in comparisons_queryset.values_list(
+            "comparison__user_id",
+            "comparison__entity_1_id",
+            "comparison__entity_2_id",
+            "criteria",
+            "score",
+            "weight",
+        ).iterator(chunk_size=10000)
     ]
 
     return comparison_data
 
 
-def save_data(video_scores, contributor_rating_scores, poll, trusted_only=True):
+def save_data(
+    video_scores, contributor_rating_scores, poll, trusted_only=True, trusted_user_ids=None
+):
     """
     Saves in the scores for Entities and ContributorRatings
+
+    trusted_user_ids (int set): output of get_trusted_user_ids(),
+        fetched here if not provided
     """
-    trusted_user_ids = set(User.trusted_users().values_list("id", flat=True))
+    if trusted_user_ids is None:
+        trusted_user_ids = get_trusted_user_ids()
 
     if trusted_only:
         EntityCriteriaScore.objects.filter(poll_id=poll.pk).delete()
@@ -101,17 +120,15 @@ def save_data(video_scores, contributor_rating_scores, poll, trusted_only=True):
             for video_id, criteria, score, uncertainty in video_scores
         )
 
-        entities = []
-        for entity in (
-            Entity.objects.filter(criteria_scores__poll=poll)
-            .distinct()
-            .prefetch_related("criteria_scores")
-        ):
-            entity.tournesol_score = 10 * sum(
-                criterion.score for criterion in entity.criteria_scores.all()
-            )
-            entities.append(entity)
-        Entity.objects.bulk_update(entities, ["tournesol_score"])
+        # sum of criteria scores aggregated by the database, in one UPDATE
+        criteria_scores_sum = (
+            EntityCriteriaScore.objects.filter(entity=OuterRef("pk"))
+            .annotate(total=Func("score", function="Sum"))
+            .values("total")
+        )
+        Entity.objects.filter(criteria_scores__poll=poll).update(
+            tournesol_score=10.0 * Subquery(criteria_scores_sum)
+        )
 
         contributor_scores_to_save = [
             (contributor_id, video_id, criteria, score, uncertainty)
@@ -137,11 +154,24 @@ def save_data(video_scores, contributor_rating_scores, poll, trusted_only=True):
             if contributor_id not in trusted_user_ids
         ]
 
+    if trusted_only:
+        ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__poll_id=poll.pk
+        ).filter(contributor_rating__user__in=trusted_user_ids).delete()
+    else:
+        ContributorRatingCriteriaScore.objects.filter(
+            contributor_rating__poll_id=poll.pk
+        ).exclude(contributor_rating__user__in=trusted_user_ids).delete()
+
+    if not contributor_scores_to_save:  # no rating to look up nor to create
+        return
+
+    # lookup dict restricted to this poll, ratings of other polls can't match
     rating_ids = {
         (contributor_id, video_id): rating_id
-        for rating_id, contributor_id, video_id in ContributorRating.objects.all().values_list(
-            "id", "user_id", "entity_id"
-        )
+        for rating_id, contributor_id, video_id in ContributorRating.objects.filter(
+            poll_id=poll.pk
+        ).values_list("id", "user_id", "entity_id")
     }
     ratings_to_create = set(
         (contributor_id, video_id)
@@ -160,15 +190,6 @@ def save_data(video_scores, contributor_rating_scores, poll, trusted_only=True):
         {(rating.user_id, rating.entity_id): rating.id for rating in created_ratings}
     )
 
-    if trusted_only:
-        ContributorRatingCriteriaScore.objects.filter(
-            contributor_rating__poll_id=poll.pk
-        ).filter(contributor_rating__user__in=User.trusted_users()).delete()
-    else:
-        ContributorRatingCriteriaScore.objects.filter(
-            contributor_rating__poll_id=poll.pk
-        ).exclude(contributor_rating__user__in=User.trusted_users()).delete()
-
     ContributorRatingCriteriaScore.objects.bulk_create(
         ContributorRatingCriteriaScore(
             contributor_rating_id=rating_ids[(contributor_id, video_id)],
@@ -180,14 +201,22 @@ def save_data(video_scores, contributor_rating_scores, poll, trusted_only=True):
     )
 
 
-def process(trusted_only=True):
+def process(trusted_only=True, trusted_user_ids=None):
     for poll in Poll.objects.all():
         poll_criterias_list = poll.criterias_list
-        poll_comparison_data = fetch_data(poll=poll, trusted_only=trusted_only)
+        poll_comparison_data = fetch_data(
+            poll=poll, trusted_only=trusted_only, trusted_user_ids=trusted_user_ids
+        )
         glob_score, loc_score = ml_run(
             poll_comparison_data, criterias=poll_criterias_list, save=True, verb=-1
         )
-        save_data(glob_score, loc_score, poll, trusted_only=trusted_only)
+        save_data(
+            glob_score,
+            loc_score,
+            poll,
+            trusted_only=trusted_only,
+            trusted_user_ids=trusted_user_ids,
+        )
 
 
 class Command(BaseCommand):
@@ -205,11 +234,14 @@ class Command(BaseCommand):
         if TOURNESOL_DEV:
             logging.error("You must turn TOURNESOL_DEV to 0 to use this")
         else:  # production
+            # Trusted users are fetched once for both runs
+            trusted_user_ids = get_trusted_user_ids()
+
             # Run for trusted users
             logging.debug("Process on trusted users")
-            process()
+            process(trusted_user_ids=trusted_user_ids)
 
             if not skip_untrusted:
                 # Run for all users including non trusted users
                 logging.debug("Process on all users")
-                process(trusted_only=False)
+                process(trusted_only=False, trusted_user_ids=trusted_user_ids)
@@ -1,11 +1,10 @@
 import logging
-from copy import deepcopy
 from statistics import median
 
 import torch
 from torch.autograd.functional import hessian
 
-from .losses import loss_fit_s_gen, loss_gen_reg, models_dist, round_loss
+from .losses import loss_fit_s_gen, loss_gen_reg, round_loss
 
 """
 Metrics used for training monitoring in "licchavi.py"
@@ -83,14 +82,19 @@ def get_uncertainty_glob(licch):
     """
     with torch.no_grad():
         uncerts = torch.empty(licch.nb_vids)  # all global uncertainties
-        all_vids = list(licch.vid_vidx.keys())  # all video IDs
-        for vidx in range(licch.nb_vids):  # for each video
-            distances = []
-            for node in licch.nodes.values():
-                if all_vids[vidx] in node.vids:
-                    dist = models_dist(node.model, licch.global_model, vidx=vidx)
-                    distances.append(dist.item())
-            uncerts[vidx] = _global_uncert(distances)
+        # only rated scores kept, one element per (node, video) couple
+        vidxs = torch.cat(list(licch.all_nodes("vidxs")))
+        dists = torch.cat(
+            [
+                (node.model[node.vidxs] - licch.global_model[node.vidxs]).abs()
+                for node in licch.nodes.values()
+            ]
+        )
+        # grouped once by video index, nodes order kept
+        dists = dists[torch.argsort(vidxs, stable=True)]
+        counts = torch.bincount(vidxs, minlength=licch.nb_vids).tolist()
+        for vidx, distances in enumerate(torch.split(dists, counts)):
+            uncerts[vidx] = _global_uncert(distances.tolist())
     return uncerts
 
 
@@ -129,20 +133,19 @@ def get_uncertainty_loc(licch):
         licch (Licchavi()): licchavi object
 
     Returns:
-        (float tensor list): uncertainty for all local scores
+        (float tensor list): uncertainty for all local scores, one tensor per node
     """
     logging.info("Computing uncertainty")
     local_uncert = []
     for uid, node in licch.nodes.items():  # for all nodes
-        local_uncerts = []
-        for vid in node.vids:  # for all videos of the node
-            vidx = licch.vid_vidx[vid]  # video index
-            score = node.model[vidx: vidx + 1].detach()
-            score = deepcopy(score)
+        local_uncerts = torch.empty(len(node.vidxs))  # filled video by video
+        model = node.model  # leaf model, replaced during hessian computation
+        for i, vidx in enumerate(node.vidxs.tolist()):  # for all videos of the node
+            score = model[vidx: vidx + 1].detach().clone()
             fun = _get_hessian_fun_loc(licch, uid, vidx)
             deriv2 = hessian(fun, score)
-            uncert = deriv2 ** (-0.5)
-            local_uncerts.append(uncert)
+            node.model = model  # not chaining graphs from one video to another
+            local_uncerts[i] = deriv2.reshape(()) ** -0.5
         local_uncert.append(local_uncerts)
     return local_uncert
 
@@ -157,8 +160,8 @@ def _random_signs(epsilon, nb_vids):
     Returns:
         (float tensor): coordinates are +/-epsilon randomly
     """
-    rand = torch.randint(2, size=(1, nb_vids))[0] - 0.5
-    return rand * 2 * epsilon
+    rand = torch.randint(2, size=(nb_vids,), dtype=torch.float32)
+    return rand.mul_(2).sub_(1).mul_(epsilon)  # in place, no temporary
 
 
 def check_equilibrium_glob(epsilon, licch):
@@ -229,7 +232,7 @@ def check_equilibrium_loc(epsilon, licch):
         loss.backward()
         # adding derivatives
         for uidx, node in enumerate(licch.nodes.values()):
-            l_derivs[uidx] = node.model.grad * increment
+            torch.mul(node.model.grad, increment, out=l_derivs[uidx])
         # removing epsilon from score
         with torch.no_grad():
             for node in licch.nodes.values():
@@ -6,18 +6,21 @@ Main file is "ml_train.py"
 
 
 class Node:
-    def __init__(self, vid1, vid2, r, vids, mask, s, model, age, w, lr_node, lr_s, opt):
-        self.vid1 = vid1
-        self.vid2 = vid2
+    def __init__(
+        self, vidx1, vidx2, r, vids, vidxs, mask, s, model, age, w, lr_node, lr_s, opt
+    ):
+        self.vidx1 = vidx1  # video indexes of comparisons, no one-hot matrix
+        self.vidx2 = vidx2
         self.r = r
         self.vids = vids
+        self.vidxs = vidxs  # video indexes of -vids, computed once
         self.mask = mask
         self.s = s
         self.model = model
         self.age = age  # number of epochs the node has been trained
         self.w = w
 
-        self.lr_s = lr_s / len(vid1)
+        self.lr_s = lr_s / len(vidx1)
         self.opt = opt(
             [
                 {"params": self.model},
@@ -10,9 +10,10 @@ from ml.data_utility import (
     rescale_rating,
     reverse_idxs,
     sort_by_first,
+    vids_to_vidxs,
 )
 from ml.dev.fake_data import generate_data
-from ml.handle_data import distribute_data, select_criteria, shape_data
+from ml.handle_data import distribute_data, group_by_criteria, select_criteria, shape_data
 from ml.licchavi import Licchavi, get_model, get_s
 from ml.losses import _approx_bbt_loss, _bbt_loss, get_s_loss, model_norm, models_dist
 from ml.metrics import (
@@ -43,6 +44,7 @@ TEST_DATA = [
     [0, 100, 101, "largely_recommended", 10, 0],
 ]
 CRITERIAS = ["test"]
+TEST_DATA_ONE_CRIT = select_criteria(TEST_DATA, "test")
 
 
 def _dic_inclusion(a, b):
@@ -71,10 +73,11 @@ def test_get_all_vids():
 
 
 def test_get_mask():
-    input = torch.randint(2, (5, 4), dtype=bool)  # boolean tensor
-    input2 = torch.zeros((5, 4), dtype=bool)
-    mask = get_mask(input, input2)
+    vidxs1 = torch.tensor([0, 2, 0])
+    vidxs2 = torch.tensor([2, 1, 1])
+    mask = get_mask(vidxs1, vidxs2, 4)
     assert mask.shape == torch.Size([4])
+    assert mask.tolist() == [True, True, True, False]
 
 
 def test_sort_by_first():
@@ -97,6 +100,13 @@ def test_reverse_idx():
     assert isinstance(vid_vidx, dict)  # output is a dictionnary
 
 
+def test_vids_to_vidxs():
+    vid_vidx = {100: 0, 200: 2, 300: 1}
+    vidxs = vids_to_vidxs(vid_vidx, [300, 100, 300, 200])
+    assert (vidxs == np.array([1, 0, 1, 2])).all()  # same order as input
+    assert len(vids_to_vidxs(vid_vidx, [])) == 0
+
+
 def test_expand_tens():
     len1, len2 = 4, 2
     tens = torch.ones(len1)
@@ -127,6 +137,14 @@ def test_select_criteria():
     assert len(output) == len(TEST_DATA) - 1  # number of comparisons extracted
 
 
+def test_group_by_criteria():
+    comparison_data = TEST_DATA + [[3, 100, 101, "test", None, 0]]
+    output = group_by_criteria(comparison_data)
+    assert set(output.keys()) == {"test", "largely_recommended"}
+    for crit, l_ratings in output.items():
+        assert l_ratings == select_criteria(comparison_data, crit)
+
+
 def test_shape_data():
     l_ratings = [
         [0, 100, 101, "test", 10, 0],
@@ -151,9 +169,9 @@ def test_distribute_data():
     nodes_dic, user_ids, vid_vidx = distribute_data(arr)
     assert len(nodes_dic) == 2  # number of nodes
     assert len(nodes_dic[0][0]) == 2  # number of comparisons for user 0
-    assert len(nodes_dic[0][0][0]) == 3  # total number of videos
+    assert len(nodes_dic[0][-1]) == 3  # total number of videos (mask)
     assert len(user_ids) == len(nodes_dic)  # number of users
-    assert len(vid_vidx) == len(nodes_dic[0][0][0])  # total number of videos
+    assert len(vid_vidx) == len(nodes_dic[0][-1])  # total number of videos
 
 
 # ------------ losses.py ---------------------
@@ -230,7 +248,7 @@ def test_random_signs():
 
 
 def test_get_uncertainty_glob():
-    licch, _ = _set_licchavi(TEST_DATA, "test", verb=-1)
+    licch, _ = _set_licchavi(TEST_DATA_ONE_CRIT, "test", verb=-1)
     licch.train(3, -1)
     uncert_glob = get_uncertainty_glob(licch)
     assert type(uncert_glob) is torch.Tensor
@@ -239,7 +257,7 @@ def test_get_uncertainty_glob():
 
 
 def test_get_uncertainty_loc():
-    licch, _ = _set_licchavi(TEST_DATA, "test", verb=-1)
+    licch, _ = _set_licchavi(TEST_DATA_ONE_CRIT, "test", verb=-1)
     licch.train(3, -1)
     uncert_loc = get_uncertainty_loc(licch)
     assert type(uncert_loc) is list
@@ -247,25 +265,27 @@ def test_get_uncertainty_loc():
     for node in uncert_loc:
         for uncert in node:
             assert 0 <= uncert <= 10
+    for node in licch.nodes.values():
+        assert node.model.is_leaf  # models restored after hessian computation
 
 
 def test_check_equilibrium_glob():
     """checks equilibrium at initialisation"""
-    licch, _ = _set_licchavi(TEST_DATA, "test", verb=-1)
+    licch, _ = _set_licchavi(TEST_DATA_ONE_CRIT, "test", verb=-1)
     eq = check_equilibrium_glob(0.001, licch)
     assert eq == 1.0
 
 
 def test_check_equilibrium_loc():
     """checks equilibrium at initialisation"""
-    licch, _ = _set_licchavi(TEST_DATA, "test", verb=-1)
+    licch, _ = _set_licchavi(TEST_DATA_ONE_CRIT, "test", verb=-1)
     eq = check_equilibrium_loc(0.01, licch)
     assert 0.4 <= eq <= 1
 
 
 # --------- core.py ------------
 def test_set_licchavi():
-    licch, users_ids = _set_licchavi(TEST_DATA, "test")
+    licch, users_ids = _set_licchavi(TEST_DATA_ONE_CRIT, "test")
     print(type(users_ids))
     print(np.array(licch.nodes.keys()))
     print(licch.nodes.keys() == users_ids)
@@ -280,7 +300,7 @@ def test_set_licchavi():
 
 
 def test_train_predict():
-    licch, users_ids = _set_licchavi(TEST_DATA, "test", verb=-1)
+    licch, users_ids = _set_licchavi(TEST_DATA_ONE_CRIT, "test", verb=-1)
     glob, loc, _ = _train_predict(licch, 1, verb=-1)
     assert len(glob) == len(loc) == 2  # good output shape
     assert len(users_ids) == len(loc[1])  # good nb of users
@@ -306,6 +326,36 @@ def test_ml_run():
     assert len(contributor_scores) == nb_users * vids_per_user
 
 
+def test_ml_run_parallel():
+    """checks that training criterias in parallel gives same scores"""
+    rng = np.random.default_rng(0)
+    comparison_data = [
+        [uid, 100 + vid1, 200 + vid2, crit, rating, 0]
+        for uid, vid1, vid2, crit, rating in zip(
+            rng.integers(10, size=200),
+            rng.integers(20, size=200),
+            rng.integers(20, size=200),
+            rng.choice(["test", "other"], size=200).tolist(),
+            rng.uniform(-10, 10, size=200),
+        )
+    ]
+    outputs = [
+        ml_run(
+            comparison_data,
+            epochs=5,
+            criterias=["test", "other"],
+            resume=False,
+            save=False,
+            verb=-1,
+            nb_workers=nb_workers,
+        )[:2]
+        for nb_workers in (1, 2)
+    ]
+    (glob1, loc1), (glob2, loc2) = outputs
+    assert sorted(glob1) == sorted(glob2)
+    assert sorted(loc1) == sorted(loc2)
+
+
 # ======= scores quality tests =============
 def _id_score_assert(id, score, glob):
     """assert that the video with this -id has this -score"""
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-15 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournesol', '0033_add_poll_presidentielle2022'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contributorrating',
+            index=models.Index(fields=['poll', 'user', 'entity'], name='tournesol_c_poll_id_662d7a_idx'),
+        ),
+    ]
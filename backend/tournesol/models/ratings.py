@@ -36,6 +36,10 @@ class ContributorRating(models.Model):
 
     class Meta:
         unique_together = ["user", "entity", "poll"]
+        indexes = [
+            # ratings are commonly fetched for a whole poll, by the ML for instance
+            models.Index(fields=["poll", "user", "entity"]),
+        ]
 
     def __str__(self):
         return "%s on %s" % (self.user, self.entity)
@@ -69,6 +69,22 @@ class TestMlTrain(TestCase):
         self.assertEqual(EntityCriteriaScore.objects.filter(poll=self.poll).count(),20)
         self.assertEqual(EntityCriteriaScore.objects.filter(poll=Poll.default_poll()).count(),2)
 
+    def test_ml_contributor_scores_saved_on_their_poll(self):
+        # Same user and same entities compared in both polls
+        ComparisonCriteriaScoreFactory(comparison__user=self.user1, comparison__poll=self.poll, comparison__entity_1=self.video1, comparison__entity_2=self.video2, score=-10)
+
+        call_command("ml_train")
+
+        for poll in [self.poll, Poll.default_poll()]:
+            contributor_rating = ContributorRating.objects.get(poll=poll, user=self.user1, entity=self.video1)
+            self.assertEqual(contributor_rating.criteria_scores.count(), 1)
+        self.assertEqual(
+            ContributorRatingCriteriaScore.objects.filter(
+                contributor_rating__user=self.user1,
+                contributor_rating__entity=self.video1,
+            ).count(),
+            2
+        )
 
     def test_ml_train_skip_untrusted(self):
         # Test on trusted users only